@@ -3,7 +3,31 @@ from cvise.utils import nestedmatcher
 from cvise.utils.error import UnknownArgumentError
 
 
+def _replace_all(string, match):
+    return string[0:match[0]] + string[match[1]:]
+
+
+def _replace_only(string, match):
+    return string[0:match[0]] + string[(match[0] + 1):(match[1] - 1)] + string[match[1]:]
+
+
+def _replace_inside(string, match):
+    return string[0:(match[0] + 1)] + string[(match[1] - 1):]
+
+
+def _replace_with_zero(string, match):
+    return string[0:match[0]] + '0' + string[match[1]:]
+
+
+def _replace_with_semicolon(string, match):
+    return string[0:match[0]] + ';' + string[match[1]:]
+
+
 class BalancedPass(AbstractPass):
+    def __init__(self, arg=None, external_programs=None):
+        super().__init__(arg, external_programs)
+        self.__config = None
+
     def check_prerequisites(self):
         return True
 
@@ -26,66 +50,63 @@ class BalancedPass(AbstractPass):
         return self.__get_next_match(test_case, pos=state[0])
 
     def __get_config(self):
+        # The configuration only depends on self.arg, build it once per instance
+        if self.__config is None:
+            self.__config = self.__create_config()
+        return self.__config
+
+    def __create_config(self):
         config = {'search': None,
                   'replace_fn': None,
                   'prefix': '',
                   }
 
-        def replace_all(string, match):
-            return string[0:match[0]] + string[match[1]:]
-
-        def replace_only(string, match):
-            return string[0:match[0]] + string[(match[0] + 1):(match[1] - 1)] + string[match[1]:]
-
-        def replace_inside(string, match):
-            return string[0:(match[0] + 1)] + string[(match[1] - 1):]
-
         if self.arg == 'square-inside':
             config['search'] = nestedmatcher.BalancedExpr.squares
-            config['replace_fn'] = replace_inside
+            config['replace_fn'] = _replace_inside
         elif self.arg == 'angles-inside':
             config['search'] = nestedmatcher.BalancedExpr.angles
-            config['replace_fn'] = replace_inside
+            config['replace_fn'] = _replace_inside
         elif self.arg == 'parens-inside':
             config['search'] = nestedmatcher.BalancedExpr.parens
-            config['replace_fn'] = replace_inside
+            config['replace_fn'] = _replace_inside
         elif self.arg == 'curly-inside':
             config['search'] = nestedmatcher.BalancedExpr.curlies
-            config['replace_fn'] = replace_inside
+            config['replace_fn'] = _replace_inside
         elif self.arg == 'square':
             config['search'] = nestedmatcher.BalancedExpr.squares
-            config['replace_fn'] = replace_all
+            config['replace_fn'] = _replace_all
         elif self.arg == 'angles':
             config['search'] = nestedmatcher.BalancedExpr.angles
-            config['replace_fn'] = replace_all
+            config['replace_fn'] = _replace_all
         elif self.arg == 'parens-to-zero':
             config['search'] = nestedmatcher.BalancedExpr.parens
-            config['replace_fn'] = lambda string, match: string[0:match[0]] + '0' + string[match[1]:]
+            config['replace_fn'] = _replace_with_zero
         elif self.arg == 'parens':
             config['search'] = nestedmatcher.BalancedExpr.parens
-            config['replace_fn'] = replace_all
+            config['replace_fn'] = _replace_all
         elif self.arg == 'curly':
             config['search'] = nestedmatcher.BalancedExpr.curlies
-            config['replace_fn'] = replace_all
+            config['replace_fn'] = _replace_all
         elif self.arg == 'curly2':
             config['search'] = nestedmatcher.BalancedExpr.curlies
-            config['replace_fn'] = lambda string, match: string[0:match[0]] + ';' + string[match[1]:]
+            config['replace_fn'] = _replace_with_semicolon
         elif self.arg == 'curly3':
             config['search'] = nestedmatcher.BalancedExpr.curlies
-            config['replace_fn'] = replace_all
+            config['replace_fn'] = _replace_all
             config['prefix'] = '=\\s*'
         elif self.arg == 'parens-only':
             config['search'] = nestedmatcher.BalancedExpr.parens
-            config['replace_fn'] = replace_only
+            config['replace_fn'] = _replace_only
         elif self.arg == 'curly-only':
             config['search'] = nestedmatcher.BalancedExpr.curlies
-            config['replace_fn'] = replace_only
+            config['replace_fn'] = _replace_only
         elif self.arg == 'angles-only':
             config['search'] = nestedmatcher.BalancedExpr.angles
-            config['replace_fn'] = replace_only
+            config['replace_fn'] = _replace_only
         elif self.arg == 'square-only':
             config['search'] = nestedmatcher.BalancedExpr.squares
-            config['replace_fn'] = replace_only
+            config['replace_fn'] = _replace_only
         else:
             raise UnknownArgumentError(self.__class__.__name__, self.arg)
 
@@ -4,6 +4,14 @@ from cvise.passes.abstract import AbstractPass, PassResult
 from cvise.utils.error import UnknownArgumentError
 
 
+def _replace_printf(m):
+    return r"printf('%d\n', (int){})".format(m.group('list').split(',')[0])
+
+
+def _replace_empty(m):
+    return ''
+
+
 class SpecialPass(AbstractPass):
     def check_prerequisites(self):
         return True
@@ -13,21 +21,15 @@ class SpecialPass(AbstractPass):
                   'replace_fn': None,
                   }
 
-        def replace_printf(m):
-            return r"printf('%d\n', (int){})".format(m.group('list').split(',')[0])
-
-        def replace_empty(m):
-            return ''
-
         if self.arg == 'a':
             config['search'] = r'transparent_crc\s*\((?P<list>[^)]*)\)'
-            config['replace_fn'] = replace_printf
+            config['replace_fn'] = _replace_printf
         elif self.arg == 'b':
             config['search'] = r"extern 'C'"
-            config['replace_fn'] = replace_empty
+            config['replace_fn'] = _replace_empty
         elif self.arg == 'c':
             config['search'] = r"extern 'C\+\+'"
-            config['replace_fn'] = replace_empty
+            config['replace_fn'] = _replace_empty
         else:
             raise UnknownArgumentError(self.__class__.__name__, self.arg)
 
@@ -48,7 +50,12 @@ class SpecialPass(AbstractPass):
         with open(test_case, 'r') as in_file:
             prog = in_file.read()
             regex = re.compile(config['search'], flags=re.DOTALL)
-            modifications = list(reversed([(m.span(), config['replace_fn'](m)) for m in regex.finditer(prog)]))
+            if config['replace_fn'] is _replace_empty:
+                # The replacement is constant, do not call the function for every match
+                modifications = [(m.span(), '') for m in regex.finditer(prog)]
+            else:
+                modifications = [(m.span(), config['replace_fn'](m)) for m in regex.finditer(prog)]
+            modifications.reverse()
             if not modifications:
                 return None
             return {'modifications': modifications, 'index': 0}
@@ -68,7 +75,10 @@ class SpecialPass(AbstractPass):
             data = in_file.read()
             index = state['index']
             ((start, end), replacement) = state['modifications'][index]
-            new_data = data[:start] + replacement + data[end:]
+            if replacement:
+                new_data = data[:start] + replacement + data[end:]
+            else:
+                new_data = data[:start] + data[end:]
             with open(test_case, 'w') as out_file:
                 out_file.write(new_data)
                 return (PassResult.OK, state)
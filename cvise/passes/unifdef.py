@@ -1,4 +1,4 @@
-import filecmp
+import hashlib
 import os
 import shutil
 import subprocess
@@ -8,6 +8,12 @@ from cvise.passes.abstract import AbstractPass, PassResult
 
 
 class UnIfDefPass(AbstractPass):
+    # (test case digest, flag) pairs known to leave the test case unchanged;
+    # kept at class level so that it survives across tasks in a worker process
+    no_effect_cache = set()
+    NO_EFFECT_CACHE_SIZE = 100000
+    BATCH_SIZE = 16
+
     def check_prerequisites(self):
         return self.check_external_program('unifdef')
 
@@ -20,6 +26,42 @@ class UnIfDefPass(AbstractPass):
     def advance_on_success(self, test_case, state):
         return state
 
+    @staticmethod
+    def __is_unchanged(prog, path):
+        # Cheap size check first, the content is compared only for equally sized files
+        if os.path.getsize(path) != len(prog):
+            return False
+        with open(path, 'rb') as f:
+            return f.read() == prog
+
+    def __remember_no_effect(self, digest, flags):
+        if len(self.no_effect_cache) + len(flags) > self.NO_EFFECT_CACHE_SIZE:
+            self.no_effect_cache.clear()
+        self.no_effect_cache.update((digest, flag) for flag in flags)
+
+    def __run_unifdef(self, flags, out_file, test_case, process_event_notifier):
+        cmd = [self.external_programs['unifdef'], '-B', '-x', '2'] + flags + ['-o', out_file, test_case]
+        stdout, stderr, returncode = process_event_notifier.run_process(cmd)
+        return returncode == 0
+
+    def __batch_has_no_effect(self, batch, prog, digest, out_file, test_case, process_event_notifier):
+        # Assumes unifdef resolves at least the same directives when given more
+        # symbols, so that a batch without effect implies single flags without
+        # effect. That does not hold when an expression only fails to evaluate
+        # with the extra symbols (e.g. a division by zero); such a flag is then
+        # skipped, which loses a variant but never produces a wrong one
+        flags = []
+        for du in ('-D', '-U'):
+            du_flags = ['{}{}'.format(du, def_) for def_ in batch]
+            if not self.__run_unifdef(du_flags, out_file, test_case, process_event_notifier):
+                return False
+            if not self.__is_unchanged(prog, out_file):
+                return False
+            flags += du_flags
+
+        self.__remember_no_effect(digest, flags)
+        return True
+
     def transform(self, test_case, state, process_event_notifier):
         try:
             cmd = [self.external_programs['unifdef'], '-s', test_case]
@@ -27,33 +69,55 @@ class UnIfDefPass(AbstractPass):
         except subprocess.SubprocessError:
             return (PassResult.ERROR, state)
 
-        defs = {}
+        deflist = sorted(set(proc.stdout.splitlines()))
 
-        for line in proc.stdout.splitlines():
-            defs[line] = 1
-
-        deflist = sorted(defs.keys())
+        with open(test_case, 'rb') as in_file:
+            prog = in_file.read()
+        digest = hashlib.sha256(prog).digest()
 
         tmp = os.path.dirname(test_case)
-        with tempfile.NamedTemporaryFile(mode='w+', delete=False, dir=tmp) as tmp_file:
+        # symbols below this index are not tried in a batch again
+        batch_end = 0
+        # batches are only probed after a flag turned out to have no effect,
+        # so that the common case of an effective flag costs one run
+        probe_batch = False
+        fd, tmp_name = tempfile.mkstemp(dir=tmp)
+        os.close(fd)
+        try:
             while True:
                 du = '-D' if state % 2 == 0 else '-U'
                 n_index = int(state / 2)
 
                 if n_index >= len(deflist):
-                    os.unlink(tmp_file.name)
                     return (PassResult.STOP, state)
 
                 def_ = deflist[n_index]
+                flag = '{}{}'.format(du, def_)
+
+                if (digest, flag) in self.no_effect_cache:
+                    probe_batch = True
+                    state += 1
+                    continue
+
+                if probe_batch and state % 2 == 0 and n_index >= batch_end:
+                    batch = deflist[n_index:n_index + self.BATCH_SIZE]
+                    batch_end = n_index + len(batch)
+                    if len(batch) > 1 and self.__batch_has_no_effect(batch, prog, digest, tmp_name, test_case, process_event_notifier):
+                        state += 2 * len(batch)
+                        continue
+                    probe_batch = False
 
-                cmd = [self.external_programs['unifdef'], '-B', '-x', '2', '{}{}'.format(du, def_), '-o', tmp_file.name, test_case]
-                stdout, stderr, returncode = process_event_notifier.run_process(cmd)
-                if returncode != 0:
+                if not self.__run_unifdef([flag], tmp_name, test_case, process_event_notifier):
                     return (PassResult.ERROR, state)
 
-                if filecmp.cmp(test_case, tmp_file.name, shallow=False):
+                if self.__is_unchanged(prog, tmp_name):
+                    self.__remember_no_effect(digest, [flag])
+                    probe_batch = True
                     state += 1
                     continue
 
-                shutil.move(tmp_file.name, test_case)
+                shutil.move(tmp_name, test_case)
                 return (PassResult.OK, state)
+        finally:
+            if os.path.exists(tmp_name):
+                os.unlink(tmp_name)
@@ -0,0 +1,14 @@
+import os
+import shutil
+import tempfile
+
+import pytest
+
+
+@pytest.fixture(scope='module')
+def scratch_dir():
+    # Prefer a RAM-backed filesystem for the scratch files when available
+    tmp_root = '/dev/shm' if os.path.isdir('/dev/shm') else None
+    tmp_dir = tempfile.mkdtemp(prefix='cvise-', dir=tmp_root)
+    yield tmp_dir
+    shutil.rmtree(tmp_dir)
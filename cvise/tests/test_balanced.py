@@ -1,313 +1,142 @@
 import os
-import tempfile
-import unittest
 
 from cvise.passes.abstract import PassResult
 from cvise.passes.balanced import BalancedPass
+from cvise.tests.testabstract import collect_all_transforms
+import pytest
 
-
-class BalancedParensTestCase(unittest.TestCase):
-    def setUp(self):
-        self.pass_ = BalancedPass('parens')
-
-    def test_parens_no_match(self):
-        with tempfile.NamedTemporaryFile(mode='w', delete=False) as tmp_file:
-            tmp_file.write('This is a simple test!\n')
-
-        state = self.pass_.new(tmp_file.name)
-        (_, state) = self.pass_.transform(tmp_file.name, state, None)
-
-        with open(tmp_file.name) as variant_file:
-            variant = variant_file.read()
-
-        os.unlink(tmp_file.name)
-
-        self.assertEqual(variant, 'This is a simple test!\n')
-
-    def test_parens_simple(self):
-        with tempfile.NamedTemporaryFile(mode='w', delete=False) as tmp_file:
-            tmp_file.write('This is a (simple) test!\n')
-
-        state = self.pass_.new(tmp_file.name)
-        (_, state) = self.pass_.transform(tmp_file.name, state, None)
-
-        with open(tmp_file.name) as variant_file:
-            variant = variant_file.read()
-
-        os.unlink(tmp_file.name)
-
-        self.assertEqual(variant, 'This is a  test!\n')
-
-    def test_parens_nested_outer(self):
-        with tempfile.NamedTemporaryFile(mode='w', delete=False) as tmp_file:
-            tmp_file.write('This (is a (simple) test)!\n')
-
-        state = self.pass_.new(tmp_file.name)
-        (_, state) = self.pass_.transform(tmp_file.name, state, None)
-
-        with open(tmp_file.name) as variant_file:
-            variant = variant_file.read()
-
-        os.unlink(tmp_file.name)
-
-        self.assertEqual(variant, 'This !\n')
-
-    def test_parens_nested_inner(self):
-        with tempfile.NamedTemporaryFile(mode='w', delete=False) as tmp_file:
-            tmp_file.write('This (is a (simple) test)!\n')
-
-        state = self.pass_.new(tmp_file.name)
-        # Transform failed
-        state = self.pass_.advance(tmp_file.name, state)
-        (_, state) = self.pass_.transform(tmp_file.name, state, None)
-
-        with open(tmp_file.name) as variant_file:
-            variant = variant_file.read()
-
-        os.unlink(tmp_file.name)
-
-        self.assertEqual(variant, 'This (is a  test)!\n')
-
-
-class BalancedParensOnlyTestCase(unittest.TestCase):
-    def setUp(self):
-        self.pass_ = BalancedPass('parens-only')
-
-    def test_parens_no_match(self):
-        with tempfile.NamedTemporaryFile(mode='w', delete=False) as tmp_file:
-            tmp_file.write('This is a simple test!\n')
-
-        state = self.pass_.new(tmp_file.name)
-        (_, state) = self.pass_.transform(tmp_file.name, state, None)
-
-        with open(tmp_file.name) as variant_file:
-            variant = variant_file.read()
-
-        os.unlink(tmp_file.name)
-
-        self.assertEqual(variant, 'This is a simple test!\n')
-
-    def test_parens_simple(self):
-        with tempfile.NamedTemporaryFile(mode='w', delete=False) as tmp_file:
-            tmp_file.write('This is a (simple) test!\n')
-
-        state = self.pass_.new(tmp_file.name)
-        (_, state) = self.pass_.transform(tmp_file.name, state, None)
-
-        with open(tmp_file.name) as variant_file:
-            variant = variant_file.read()
-
-        os.unlink(tmp_file.name)
-
-        self.assertEqual(variant, 'This is a simple test!\n')
-
-    def test_parens_nested_outer(self):
-        with tempfile.NamedTemporaryFile(mode='w', delete=False) as tmp_file:
-            tmp_file.write('This (is a (simple) test)!\n')
-
-        state = self.pass_.new(tmp_file.name)
-        (_, state) = self.pass_.transform(tmp_file.name, state, None)
-
-        with open(tmp_file.name) as variant_file:
-            variant = variant_file.read()
-
-        os.unlink(tmp_file.name)
-
-        self.assertEqual(variant, 'This is a (simple) test!\n')
-
-    def test_parens_nested_inner(self):
-        with tempfile.NamedTemporaryFile(mode='w', delete=False) as tmp_file:
-            tmp_file.write('This (is a (simple) test)!\n')
-
-        state = self.pass_.new(tmp_file.name)
-        # Transform failed
-        state = self.pass_.advance(tmp_file.name, state)
-        (_, state) = self.pass_.transform(tmp_file.name, state, None)
-
-        with open(tmp_file.name) as variant_file:
-            variant = variant_file.read()
-
-        os.unlink(tmp_file.name)
-
-        self.assertEqual(variant, 'This (is a simple test)!\n')
-
-    def test_parens_nested_both(self):
-        with tempfile.NamedTemporaryFile(mode='w', delete=False) as tmp_file:
-            tmp_file.write('This (is a (simple) test)!\n')
-
-        state = self.pass_.new(tmp_file.name)
-        (_, state) = self.pass_.transform(tmp_file.name, state, None)
-        state = self.pass_.advance_on_success(tmp_file.name, state)
-        (_, state) = self.pass_.transform(tmp_file.name, state, None)
-
-        with open(tmp_file.name) as variant_file:
-            variant = variant_file.read()
-
-        os.unlink(tmp_file.name)
-
-        self.assertEqual(variant, 'This is a simple test!\n')
-
-    def test_parens_nested_all(self):
-        with tempfile.NamedTemporaryFile(mode='w', delete=False) as tmp_file:
-            tmp_file.write('(This) (is a (((more)) complex) test)!\n')
-
-        state = self.pass_.new(tmp_file.name)
-        (result, state) = self.pass_.transform(tmp_file.name, state, None)
-
-        iteration = 0
-
-        while result == PassResult.OK and iteration < 7:
-            state = self.pass_.advance_on_success(tmp_file.name, state)
-            (result, state) = self.pass_.transform(tmp_file.name, state, None)
-            iteration += 1
-
-        with open(tmp_file.name) as variant_file:
-            variant = variant_file.read()
-
-        os.unlink(tmp_file.name)
-
-        self.assertEqual(iteration, 5)
-        self.assertEqual(variant, 'This is a more complex test!\n')
-
-    def test_parens_nested_no_success(self):
-        with tempfile.NamedTemporaryFile(mode='w', delete=False) as tmp_file:
-            tmp_file.write('(This) (is a (((more)) complex) test)!\n')
-
-        state = self.pass_.new(tmp_file.name)
-        (result, state) = self.pass_.transform(tmp_file.name, state, None)
-
-        iteration = 0
-
-        while result == PassResult.OK and iteration < 7:
-            with tempfile.NamedTemporaryFile(mode='w', delete=False) as tmp_file:
-                tmp_file.write('(This) (is a (((more)) complex) test)!\n')
-
-            state = self.pass_.advance(tmp_file.name, state)
-            (result, state) = self.pass_.transform(tmp_file.name, state, None)
-            iteration += 1
-
-        os.unlink(tmp_file.name)
-
-        self.assertEqual(iteration, 5)
-
-
-class BalancedParensInsideTestCase(unittest.TestCase):
-    def setUp(self):
-        self.pass_ = BalancedPass('parens-inside')
-
-    def test_parens_no_match(self):
-        with tempfile.NamedTemporaryFile(mode='w', delete=False) as tmp_file:
-            tmp_file.write('This is a simple test!\n')
-
-        state = self.pass_.new(tmp_file.name)
-        (_, state) = self.pass_.transform(tmp_file.name, state, None)
-
-        with open(tmp_file.name) as variant_file:
-            variant = variant_file.read()
-
-        os.unlink(tmp_file.name)
-
-        self.assertEqual(variant, 'This is a simple test!\n')
-
-    def test_parens_simple(self):
-        with tempfile.NamedTemporaryFile(mode='w', delete=False) as tmp_file:
-            tmp_file.write('This is a (simple) test!\n')
-
-        state = self.pass_.new(tmp_file.name)
-        (_, state) = self.pass_.transform(tmp_file.name, state, None)
-
-        with open(tmp_file.name) as variant_file:
-            variant = variant_file.read()
-
-        os.unlink(tmp_file.name)
-
-        self.assertEqual(variant, 'This is a () test!\n')
-
-    def test_parens_nested_outer(self):
-        with tempfile.NamedTemporaryFile(mode='w', delete=False) as tmp_file:
-            tmp_file.write('This (is a (simple) test)!\n')
-
-        state = self.pass_.new(tmp_file.name)
-        (_, state) = self.pass_.transform(tmp_file.name, state, None)
-
-        with open(tmp_file.name) as variant_file:
-            variant = variant_file.read()
-
-        os.unlink(tmp_file.name)
-
-        self.assertEqual(variant, 'This ()!\n')
-
-    def test_parens_nested_inner(self):
-        with tempfile.NamedTemporaryFile(mode='w', delete=False) as tmp_file:
-            tmp_file.write('This (is a (simple) test)!\n')
-
-        state = self.pass_.new(tmp_file.name)
-        # Transform failed
-        state = self.pass_.advance(tmp_file.name, state)
-        (_, state) = self.pass_.transform(tmp_file.name, state, None)
-
-        with open(tmp_file.name) as variant_file:
-            variant = variant_file.read()
-
-        os.unlink(tmp_file.name)
-
-        self.assertEqual(variant, 'This (is a () test)!\n')
-
-    def test_parens_nested_both(self):
-        with tempfile.NamedTemporaryFile(mode='w', delete=False) as tmp_file:
-            tmp_file.write('This (is a (simple) test)!\n')
-
-        state = self.pass_.new(tmp_file.name)
-        (_, state) = self.pass_.transform(tmp_file.name, state, None)
-        state = self.pass_.advance_on_success(tmp_file.name, state)
-        (_, state) = self.pass_.transform(tmp_file.name, state, None)
-
-        with open(tmp_file.name) as variant_file:
-            variant = variant_file.read()
-
-        os.unlink(tmp_file.name)
-
-        self.assertEqual(variant, 'This ()!\n')
-
-    def test_parens_nested_all(self):
-        with tempfile.NamedTemporaryFile(mode='w', delete=False) as tmp_file:
-            tmp_file.write('(This) (is a (((more)) complex) test)!\n')
-
-        state = self.pass_.new(tmp_file.name)
-        (result, state) = self.pass_.transform(tmp_file.name, state, None)
-
-        iteration = 0
-
-        while result == PassResult.OK and iteration < 4:
-            state = self.pass_.advance_on_success(tmp_file.name, state)
-            (result, state) = self.pass_.transform(tmp_file.name, state, None)
-            iteration += 1
-
-        with open(tmp_file.name) as variant_file:
-            variant = variant_file.read()
-
-        os.unlink(tmp_file.name)
-
-        self.assertEqual(iteration, 2)
-        self.assertEqual(variant, '() ()!\n')
-
-    def test_parens_nested_no_success(self):
-        with tempfile.NamedTemporaryFile(mode='w', delete=False) as tmp_file:
-            tmp_file.write('(This) (is a (((more)) complex) test)!\n')
-
-        state = self.pass_.new(tmp_file.name)
-        (result, state) = self.pass_.transform(tmp_file.name, state, None)
-
-        iteration = 0
-
-        while result == PassResult.OK and iteration < 7:
-            with tempfile.NamedTemporaryFile(mode='w', delete=False) as tmp_file:
-                tmp_file.write('(This) (is a (((more)) complex) test)!\n')
-
-            state = self.pass_.advance(tmp_file.name, state)
-            (result, state) = self.pass_.transform(tmp_file.name, state, None)
-            iteration += 1
-
-        os.unlink(tmp_file.name)
-
-        self.assertEqual(iteration, 5)
+SIMPLE = b'This is a simple test!\n'
+ONE_PAIR = b'This is a (simple) test!\n'
+NESTED = b'This (is a (simple) test)!\n'
+COMPLEX = b'(This) (is a (((more)) complex) test)!\n'
+
+
+@pytest.fixture(scope='module')
+def test_case(scratch_dir):
+    # One scratch file is rewritten in place by every test of the module
+    return os.path.join(scratch_dir, 'test_case')
+
+
+@pytest.fixture(scope='module')
+def passes():
+    # BalancedPass keeps no per-test state, all of it lives in the returned state
+    return {arg: BalancedPass(arg) for arg in ('parens', 'parens-only', 'parens-inside', 'parens-to-zero')}
+
+
+def write_test_case(path, content):
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        os.write(fd, content)
+    finally:
+        os.close(fd)
+
+
+def read_test_case(path):
+    with open(path, 'rb') as variant_file:
+        return variant_file.read()
+
+
+@pytest.mark.parametrize('arg, content, failed, expected', [
+    pytest.param('parens', SIMPLE, 0, SIMPLE, id='parens-no_match'),
+    pytest.param('parens', ONE_PAIR, 0, b'This is a  test!\n', id='parens-simple'),
+    pytest.param('parens', NESTED, 0, b'This !\n', id='parens-nested_outer'),
+    pytest.param('parens', NESTED, 1, b'This (is a  test)!\n', id='parens-nested_inner'),
+    pytest.param('parens-only', SIMPLE, 0, SIMPLE, id='parens-only-no_match'),
+    pytest.param('parens-only', ONE_PAIR, 0, SIMPLE, id='parens-only-simple'),
+    pytest.param('parens-only', NESTED, 0, b'This is a (simple) test!\n', id='parens-only-nested_outer'),
+    pytest.param('parens-only', NESTED, 1, b'This (is a simple test)!\n', id='parens-only-nested_inner'),
+    pytest.param('parens-inside', SIMPLE, 0, SIMPLE, id='parens-inside-no_match'),
+    pytest.param('parens-inside', ONE_PAIR, 0, b'This is a () test!\n', id='parens-inside-simple'),
+    pytest.param('parens-inside', NESTED, 0, b'This ()!\n', id='parens-inside-nested_outer'),
+    pytest.param('parens-inside', NESTED, 1, b'This (is a () test)!\n', id='parens-inside-nested_inner'),
+    pytest.param('parens-to-zero', SIMPLE, 0, SIMPLE, id='parens-to-zero-no_match'),
+    pytest.param('parens-to-zero', ONE_PAIR, 0, b'This is a 0 test!\n', id='parens-to-zero-simple'),
+    pytest.param('parens-to-zero', NESTED, 0, b'This 0!\n', id='parens-to-zero-nested_outer'),
+    pytest.param('parens-to-zero', NESTED, 1, b'This (is a 0 test)!\n', id='parens-to-zero-nested_inner'),
+])
+def test_single_transform(passes, test_case, arg, content, failed, expected):
+    pass_ = passes[arg]
+    write_test_case(test_case, content)
+
+    state = pass_.new(test_case)
+    # Transforms that failed
+    for _ in range(failed):
+        state = pass_.advance(test_case, state)
+    (_, state) = pass_.transform(test_case, state, None)
+
+    assert read_test_case(test_case) == expected
+
+
+@pytest.mark.parametrize('arg, expected', [
+    ('parens-only', SIMPLE),
+    ('parens-inside', b'This ()!\n'),
+])
+def test_parens_nested_both(passes, test_case, arg, expected):
+    pass_ = passes[arg]
+    write_test_case(test_case, NESTED)
+
+    state = pass_.new(test_case)
+    (_, state) = pass_.transform(test_case, state, None)
+    state = pass_.advance_on_success(test_case, state)
+    (_, state) = pass_.transform(test_case, state, None)
+
+    assert read_test_case(test_case) == expected
+
+
+@pytest.mark.parametrize('arg, max_iterations, expected_iterations, expected', [
+    ('parens-only', 7, 5, b'This is a more complex test!\n'),
+    ('parens-inside', 4, 2, b'() ()!\n'),
+])
+def test_parens_nested_all(passes, test_case, arg, max_iterations, expected_iterations, expected):
+    pass_ = passes[arg]
+    write_test_case(test_case, COMPLEX)
+
+    state = pass_.new(test_case)
+    (result, state) = pass_.transform(test_case, state, None)
+
+    iteration = 0
+
+    while result == PassResult.OK and iteration < max_iterations:
+        state = pass_.advance_on_success(test_case, state)
+        (result, state) = pass_.transform(test_case, state, None)
+        iteration += 1
+
+    assert iteration == expected_iterations
+    assert read_test_case(test_case) == expected
+
+
+@pytest.mark.parametrize('arg, expected', [
+    ('parens-only', {
+        b'This (is a (((more)) complex) test)!\n',
+        b'(This) is a (((more)) complex) test!\n',
+        b'(This) (is a ((more) complex) test)!\n',
+        b'(This) (is a ((more)) complex test)!\n',
+    }),
+    ('parens-inside', {
+        b'() (is a (((more)) complex) test)!\n',
+        b'(This) ()!\n',
+        b'(This) (is a () test)!\n',
+        b'(This) (is a (() complex) test)!\n',
+        b'(This) (is a ((()) complex) test)!\n',
+    }),
+])
+def test_parens_nested_no_success(passes, test_case, arg, expected):
+    pass_ = passes[arg]
+    write_test_case(test_case, COMPLEX)
+
+    state = pass_.new(test_case)
+    all_transforms = collect_all_transforms(pass_, state, test_case, COMPLEX)
+
+    assert all_transforms == expected
+
+
+@pytest.mark.parametrize('depth', [10, 100, 1000, 10000])
+def test_parens_nested_deep(passes, test_case, depth):
+    pass_ = passes['parens-only']
+    write_test_case(test_case, b'(' * depth + b')' * depth + b'\n')
+
+    state = pass_.new(test_case)
+    (result, state) = pass_.transform(test_case, state, None)
+
+    assert result == PassResult.OK
+    assert read_test_case(test_case) == b'(' * (depth - 1) + b')' * (depth - 1) + b'\n'
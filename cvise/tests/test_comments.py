@@ -1,82 +1,58 @@
-import os
-import tempfile
-import unittest
+from pathlib import Path
 
 from cvise.passes.abstract import PassResult
 from cvise.passes.comments import CommentsPass
+import pytest
 
 
-class CommentsTestCase(unittest.TestCase):
-    def setUp(self):
-        self.pass_ = CommentsPass('0')
+@pytest.fixture(scope='module')
+def comments_pass():
+    return CommentsPass('0')
 
-    def test_block(self):
-        with tempfile.NamedTemporaryFile(mode='w', delete=False) as tmp_file:
-            tmp_file.write('This /* contains *** /* two */ /*comments*/!\n')
 
-        state = self.pass_.new(tmp_file.name)
-        (_, state) = self.pass_.transform(tmp_file.name, state, None)
+@pytest.fixture
+def test_case(scratch_dir, request):
+    return Path(scratch_dir, request.node.name + '.c')
 
-        with open(tmp_file.name) as variant_file:
-            variant = variant_file.read()
 
-        os.unlink(tmp_file.name)
+def test_block(comments_pass, test_case):
+    test_case.write_text('This /* contains *** /* two */ /*comments*/!\n')
 
-        self.assertEqual(variant, 'This  !\n')
+    state = comments_pass.new(test_case)
+    (_, state) = comments_pass.transform(test_case, state, None)
 
-    def test_line(self):
-        with tempfile.NamedTemporaryFile(mode='w', delete=False) as tmp_file:
-            tmp_file.write('This ///contains //two\n //comments\n!\n')
+    assert test_case.read_text() == 'This  !\n'
 
-        state = self.pass_.new(tmp_file.name)
-        (_, state) = self.pass_.transform(tmp_file.name, state, None)
 
-        with open(tmp_file.name) as variant_file:
-            variant = variant_file.read()
+def test_line(comments_pass, test_case):
+    test_case.write_text('This ///contains //two\n //comments\n!\n')
 
-        os.unlink(tmp_file.name)
+    state = comments_pass.new(test_case)
+    (_, state) = comments_pass.transform(test_case, state, None)
 
-        self.assertEqual(variant, 'This \n \n!\n')
+    assert test_case.read_text() == 'This \n \n!\n'
 
-    def test_success(self):
-        with tempfile.NamedTemporaryFile(mode='w', delete=False) as tmp_file:
-            tmp_file.write('/*This*/ ///contains //two\n //comments\n!\n')
 
-        state = self.pass_.new(tmp_file.name)
-        (result, state) = self.pass_.transform(tmp_file.name, state, None)
+@pytest.mark.parametrize('rewrite', [False, True], ids=['success', 'no_success'])
+def test_advance_loop(comments_pass, test_case, rewrite):
+    content = '/*This*/ ///contains //two\n //comments\n!\n'
+    test_case.write_text(content)
 
-        iteration = 0
+    state = comments_pass.new(test_case)
+    (result, state) = comments_pass.transform(test_case, state, None)
 
-        while result == PassResult.OK and iteration < 4:
-            state = self.pass_.advance_on_success(tmp_file.name, state)
-            (result, state) = self.pass_.transform(tmp_file.name, state, None)
-            iteration += 1
+    iteration = 0
 
-        with open(tmp_file.name) as variant_file:
-            variant = variant_file.read()
+    while result == PassResult.OK and iteration < 4:
+        if rewrite:
+            # The previous transformation was not interesting
+            test_case.write_text(content)
+            state = comments_pass.advance(test_case, state)
+        else:
+            state = comments_pass.advance_on_success(test_case, state)
+        (result, state) = comments_pass.transform(test_case, state, None)
+        iteration += 1
 
-        os.unlink(tmp_file.name)
-
-        self.assertEqual(iteration, 2)
-        self.assertEqual(variant, ' \n \n!\n')
-
-    def test_no_success(self):
-        with tempfile.NamedTemporaryFile(mode='w', delete=False) as tmp_file:
-            tmp_file.write('/*This*/ ///contains //two\n //comments\n!\n')
-
-        state = self.pass_.new(tmp_file.name)
-        (result, state) = self.pass_.transform(tmp_file.name, state, None)
-
-        iteration = 0
-
-        while result == PassResult.OK and iteration < 4:
-            with tempfile.NamedTemporaryFile(mode='w', delete=False) as tmp_file:
-                tmp_file.write('/*This*/ ///contains //two\n //comments\n!\n')
-
-            state = self.pass_.advance(tmp_file.name, state)
-            (result, state) = self.pass_.transform(tmp_file.name, state, None)
-            iteration += 1
-
-        os.unlink(tmp_file.name)
-
-        self.assertEqual(iteration, 2)
+    assert iteration == 2
+    if not rewrite:
+        assert test_case.read_text() == ' \n \n!\n'
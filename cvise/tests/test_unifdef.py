@@ -0,0 +1,128 @@
+import os
+import subprocess
+
+from cvise.passes.abstract import PassResult, ProcessEventNotifier
+from cvise.passes.unifdef import UnIfDefPass
+import pytest
+
+# An 'N<i> == Z' comparison stays unknown unless both of its symbols are
+# defined, so a flag for just one of them has no effect
+NO_OPS = ''.join('#if N{:02} == Z\nint n{};\n#endif\n'.format(i, i) for i in range(20))
+CONTENT = '#ifdef A\nint a;\n#endif\n' + NO_OPS + '#ifdef Y\nint y;\n#else\nint no_y;\n#endif\n'
+
+
+class RecordingNotifier(ProcessEventNotifier):
+    def __init__(self):
+        super().__init__(None)
+        self.cmds = []
+
+    def run_process(self, cmd, *args, **kwargs):
+        self.cmds.append(cmd)
+        return super().run_process(cmd, *args, **kwargs)
+
+
+@pytest.fixture(autouse=True)
+def no_effect_cache():
+    # The cache is shared by all the instances of the pass
+    UnIfDefPass.no_effect_cache.clear()
+    yield
+    UnIfDefPass.no_effect_cache.clear()
+
+
+@pytest.fixture
+def unifdef_pass():
+    return UnIfDefPass(external_programs={'unifdef': 'unifdef'})
+
+
+@pytest.fixture
+def test_case(tmp_path):
+    return tmp_path / 'test_case.c'
+
+
+def get_flags(cmd):
+    return [arg for arg in cmd if arg.startswith(('-D', '-U'))]
+
+
+def reference_transform(test_case, state):
+    # Tries one flag at a time, as the pass did before the batching
+    proc = subprocess.run(['unifdef', '-s', str(test_case)], universal_newlines=True, stdout=subprocess.PIPE)
+    deflist = sorted(set(proc.stdout.splitlines()))
+    prog = test_case.read_text()
+    out_file = test_case.with_suffix('.out')
+
+    while state // 2 < len(deflist):
+        flag = ('-D' if state % 2 == 0 else '-U') + deflist[state // 2]
+        subprocess.run(['unifdef', '-B', '-x', '2', flag, '-o', str(out_file), str(test_case)])
+        variant = out_file.read_text()
+        out_file.unlink()
+        if variant != prog:
+            test_case.write_text(variant)
+            return (PassResult.OK, state)
+        state += 1
+
+    return (PassResult.STOP, state)
+
+
+def collect_all_results(transform, test_case):
+    results = []
+    state = 0
+
+    while True:
+        test_case.write_text(CONTENT)
+        (result, state) = transform(test_case, state)
+        results.append((result, state, test_case.read_text()))
+        if result != PassResult.OK:
+            return results
+        # The transformation was not interesting
+        state += 1
+
+
+def test_same_as_reference(unifdef_pass, test_case):
+    def transform(test_case, state):
+        return unifdef_pass.transform(str(test_case), state, ProcessEventNotifier(None))
+
+    results = collect_all_results(transform, test_case)
+
+    assert [(result, state) for (result, state, _) in results] == [
+        (PassResult.OK, 0), (PassResult.OK, 1), (PassResult.OK, 42), (PassResult.OK, 43), (PassResult.STOP, 46)
+    ]
+    assert results == collect_all_results(reference_transform, test_case)
+
+
+def test_effective_flag_single_run(unifdef_pass, test_case):
+    test_case.write_text(CONTENT)
+    notifier = RecordingNotifier()
+
+    state = unifdef_pass.new(test_case)
+    (result, state) = unifdef_pass.transform(str(test_case), state, notifier)
+
+    assert (result, state) == (PassResult.OK, 0)
+    assert [get_flags(cmd) for cmd in notifier.cmds] == [['-DA']]
+
+
+def test_no_op_run_skipped(unifdef_pass, test_case):
+    test_case.write_text(CONTENT)
+    notifier = RecordingNotifier()
+
+    # -DN00 is the first flag without effect
+    (result, state) = unifdef_pass.transform(str(test_case), 2, notifier)
+
+    assert (result, state) == (PassResult.OK, 42)
+    single_flags = [flags[0] for flags in map(get_flags, notifier.cmds) if len(flags) == 1]
+    assert single_flags == ['-DN00', '-UN00', '-DN17', '-UN17', '-DN18', '-UN18', '-DN19', '-UN19', '-DY']
+    assert ['-DN{:02}'.format(i) for i in range(1, 17)] in map(get_flags, notifier.cmds)
+    assert ['-UN{:02}'.format(i) for i in range(1, 17)] in map(get_flags, notifier.cmds)
+
+
+@pytest.mark.parametrize('content, state, expected', [
+    (CONTENT, 0, PassResult.OK),
+    (CONTENT, 44, PassResult.STOP),
+    ('#ifdef A\nint a;\n#endif\n#endif\n', 0, PassResult.ERROR),
+], ids=['ok', 'stop', 'error'])
+def test_no_temporary_file_left(unifdef_pass, test_case, content, state, expected):
+    test_case.write_text(content)
+
+    (result, _) = unifdef_pass.transform(str(test_case), state, ProcessEventNotifier(None))
+
+    assert result == expected
+    assert os.listdir(test_case.parent) == [test_case.name]
@@ -2,10 +2,37 @@ from cvise.passes.abstract import PassResult, ProcessEventNotifier
 
 
 def iterate_pass(current_pass, path):
+    process_event_notifier = ProcessEventNotifier(None)
     state = current_pass.new(path)
     while state is not None:
-        (result, state) = current_pass.transform(path, state, ProcessEventNotifier(None))
+        (result, state) = current_pass.transform(path, state, process_event_notifier)
         if result == PassResult.OK:
             state = current_pass.advance_on_success(path, state)
         else:
             state = current_pass.advance(path, state)
+
+
+# Collect all the variants produced when no transformation is successful;
+# original can pass the current content of path to avoid reading it again
+def collect_all_transforms(current_pass, state, path, original=None):
+    if original is None:
+        with open(path, 'rb') as f:
+            original = f.read()
+
+    process_event_notifier = ProcessEventNotifier(None)
+    all_outputs = set()
+    while state is not None:
+        (result, state) = current_pass.transform(path, state, process_event_notifier)
+        if result != PassResult.OK:
+            break
+
+        with open(path, 'rb+') as f:
+            variant = f.read()
+            if variant != original:
+                all_outputs.add(variant)
+                f.seek(0)
+                f.truncate()
+                f.write(original)
+
+        state = current_pass.advance(path, state)
+    return all_outputs